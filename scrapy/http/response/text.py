@@ -8,22 +8,23 @@ See documentation in docs/topics/request-response.rst
 from __future__ import annotations
 
 import json
+import re
 from contextlib import suppress
+from functools import cached_property, lru_cache
 from typing import TYPE_CHECKING, Any, AnyStr, cast
 from urllib.parse import urljoin
 
 import parsel
+from lxml import etree
 from w3lib.encoding import (
     html_body_declared_encoding,
     html_to_unicode,
-    http_content_type_encoding,
     read_bom,
     resolve_encoding,
 )
 from w3lib.html import strip_html5_whitespace
 
 from scrapy.http.response import Response
-from scrapy.utils.python import memoizemethod_noargs, to_unicode
 from scrapy.utils.response import get_base_url
 
 if TYPE_CHECKING:
@@ -38,10 +39,64 @@ if TYPE_CHECKING:
 
 _NONE = object()
 
+# the same handful of encoding names recurs across the responses of a crawl,
+# so this pure string-to-string lookup is worth memoizing at module level
+_resolve_encoding = lru_cache(maxsize=64)(resolve_encoding)
+
+# bytes mirror of the pattern w3lib's http_content_type_encoding uses, so the
+# header charset can be extracted without first decoding the whole header
+_CHARSET_RE = re.compile(rb"charset=([\w-]+)", re.IGNORECASE)
+
+# anything urljoin would not return verbatim: tab/newline noise that urlsplit
+# strips, dot segments it may normalize, empty params, query or fragment
+# components that urlunparse drops, and brackets in the authority (urlsplit
+# rejects invalid IPv6 hosts with a ValueError)
+_URLJOIN_REWRITE_RE = re.compile(
+    r"[\t\n\r]|/\.|\?#|;[?#]|[?#;]\Z|^https?://[^/?#]*[\[\]]"
+)
+
+
+# spiders tend to run the same few queries against every response of a
+# crawl, but lxml recompiles the XPath on each evaluation; compiling once per
+# (query, namespaces) pair and reusing the evaluator avoids that
+@lru_cache(maxsize=256)
+def _compiled_xpath(query: str, namespaces: tuple[tuple[str, str], ...]) -> etree.XPath:
+    return etree.XPath(query, namespaces=dict(namespaces), smart_strings=False)
+
+
+_SelectorClass: type[Selector] | None = None
+
+
+def _load_selector_class() -> type[Selector]:
+    # scrapy.selector imports scrapy.http, so it can only be imported lazily;
+    # cache the class to spare repeated sys.modules lookups on every response
+    global _SelectorClass  # noqa: PLW0603
+    if _SelectorClass is None:
+        from scrapy.selector import Selector
+
+        _SelectorClass = Selector
+    return _SelectorClass
+
 
 class TextResponse(Response):
+    # the base classes do not declare __slots__, so instances still carry a
+    # __dict__ for ad-hoc attributes; these slots just give the hot
+    # per-response attributes compact storage and direct access
+    __slots__ = (
+        "_body",
+        "_cached_base_url",
+        "_cached_benc",
+        "_cached_bom_enc",
+        "_cached_content_type",
+        "_cached_ct_bytes",
+        "_cached_decl_enc",
+        "_cached_decoded_json",
+        "_cached_hdr_enc",
+        "_cached_ubody",
+        "_encoding",
+    )
+
     _DEFAULT_ENCODING = "ascii"
-    _cached_decoded_json = _NONE
 
     attributes: tuple[str, ...] = Response.attributes + ("encoding",)
 
@@ -49,7 +104,13 @@ class TextResponse(Response):
         self._encoding: str | None = kwargs.pop("encoding", None)
         self._cached_benc: str | None = None
         self._cached_ubody: str | None = None
-        self._cached_selector: Selector | None = None
+        self._cached_content_type: str | None = None
+        self._cached_ct_bytes: bytes | None = None
+        self._cached_base_url: str | None = None
+        self._cached_decoded_json: Any = _NONE
+        self._cached_bom_enc: Any = _NONE
+        self._cached_decl_enc: Any = _NONE
+        self._cached_hdr_enc: Any = _NONE
         super().__init__(*args, **kwargs)
 
     def _set_body(self, body: str | bytes | None) -> None:
@@ -61,10 +122,13 @@ class TextResponse(Response):
                     f"{type(self).__name__} has no encoding"
                 )
             self._body = body.encode(self._encoding)
+            # the body arrived as str, so text does not need to decode the
+            # bytes we just produced from it
+            self._cached_ubody = body
         else:
             super()._set_body(body)
 
-    @property
+    @cached_property
     def encoding(self) -> str:
         return self._declared_encoding() or self._body_inferred_encoding()
 
@@ -86,34 +150,100 @@ class TextResponse(Response):
             self._cached_decoded_json = json.loads(self.body)
         return self._cached_decoded_json
 
-    @property
+    @cached_property
     def text(self) -> str:
         """Body as unicode"""
-        # access self.encoding before _cached_ubody to make sure
-        # _body_inferred_encoding is called
-        benc = self.encoding
+        # _cached_ubody can be pre-filled by _body_inferred_encoding, whose
+        # decode this property must not repeat
         if self._cached_ubody is None:
-            charset = f"charset={benc}"
-            self._cached_ubody = html_to_unicode(charset, self.body)[1]
-        return self._cached_ubody
+            if not self._body:
+                self._cached_ubody = ""
+                return ""
+            benc = self._declared_encoding()
+            ubody = None if benc is None else self._body_to_unicode(benc)
+            if ubody is None:
+                # no (usable) declared encoding, inferring it from the body
+                # also decodes it as a side effect
+                self._body_inferred_encoding()
+            else:
+                self._cached_ubody = ubody
+        return cast(str, self._cached_ubody)
+
+    def _body_to_unicode(self, encoding: str) -> str | None:
+        """Decode the body with a known encoding, or return ``None`` if
+        *encoding* is not an encoding name that Python can process.
+
+        A BOM, if present, takes precedence and is stripped from the result,
+        matching ``w3lib.encoding.html_to_unicode`` without its body scan for
+        a ``<meta>``-declared charset, which is redundant once the encoding is
+        known.
+        """
+        enc = _resolve_encoding(encoding)
+        if enc is None:
+            return None
+        body = self.body
+        if enc == "utf-8" and body[:1] not in (b"\xff", b"\xfe", b"\x00"):
+            # the dominant case: a utf-16/32 BOM would have to start with one
+            # of those bytes, so decode straight away; a utf-8 BOM survives
+            # as a leading U+FEFF and is stripped from the decoded result
+            return body.decode("utf-8", errors="replace").removeprefix("\ufeff")
+        bom_enc, bom = read_bom(body)
+        if bom_enc is not None:
+            return body[len(cast(bytes, bom)) :].decode(bom_enc, errors="replace")
+        if enc in {"utf-16", "utf-32"}:
+            # without a BOM, w3lib assumes big endian for these encodings
+            enc += "-be"
+        return body.decode(enc, errors="replace")
 
     def urljoin(self, url: str) -> str:
         """Join this Response's url with a possible relative url to form an
         absolute interpretation of the latter."""
-        return urljoin(get_base_url(self), url)
+        # extracted links are frequently absolute already, in which case
+        # urljoin would return them unchanged and the base url (and the body
+        # scan behind it) is irrelevant; anything with an empty authority
+        # (which inherits the base netloc) or that urljoin would rewrite or
+        # reject takes the full path
+        if url.startswith("http://"):
+            rest = url[7:]
+        elif url.startswith("https://"):
+            rest = url[8:]
+        else:
+            rest = ""
+        if rest and rest[0] not in "/?#" and not _URLJOIN_REWRITE_RE.search(url):
+            return url
+        return urljoin(self._base_url(), url)
+
+    def _base_url(self) -> str:
+        # get_base_url keeps a weak-keyed cache of its own, but an instance
+        # attribute read is cheaper for pages that join many links
+        if self._cached_base_url is None:
+            self._cached_base_url = get_base_url(self)
+        return self._cached_base_url
+
+    def _content_type_bytes(self) -> bytes:
+        if self._cached_ct_bytes is None:
+            self._cached_ct_bytes = cast(bytes, self.headers.get(b"Content-Type", b""))
+        return self._cached_ct_bytes
+
+    def _content_type_str(self) -> str:
+        if self._cached_content_type is None:
+            # the header is known to be bytes, so skip to_unicode's
+            # type-dispatch and decode directly
+            self._cached_content_type = self._content_type_bytes().decode("latin-1")
+        return self._cached_content_type
 
-    @memoizemethod_noargs
     def _headers_encoding(self) -> str | None:
-        content_type = cast(bytes, self.headers.get(b"Content-Type", b""))
-        return http_content_type_encoding(to_unicode(content_type, encoding="latin-1"))
+        if self._cached_hdr_enc is _NONE:
+            match = _CHARSET_RE.search(self._content_type_bytes())
+            self._cached_hdr_enc = (
+                _resolve_encoding(match.group(1).decode("latin-1")) if match else None
+            )
+        return cast("str | None", self._cached_hdr_enc)
 
     def _body_inferred_encoding(self) -> str:
         if self._cached_benc is None:
-            content_type = to_unicode(
-                cast(bytes, self.headers.get(b"Content-Type", b"")), encoding="latin-1"
-            )
             benc, ubody = html_to_unicode(
-                content_type,
+                self._content_type_str(),
                 self.body,
                 auto_detect_fun=self._auto_detect_fun,
                 default_encoding=self._DEFAULT_ENCODING,
@@ -123,49 +253,80 @@ class TextResponse(Response):
         return self._cached_benc
 
     def _auto_detect_fun(self, text: bytes) -> str | None:
-        for enc in (self._DEFAULT_ENCODING, "utf-8", "cp1252"):
+        # bytes.isascii is much cheaper than an ascii decode attempt, and
+        # ascii bodies are also valid utf-8, so it stands in for the first
+        # two trial decodes at once; cp1252 still needs its own trial, as
+        # five of its bytes (0x81, 0x8d, 0x8f, 0x90, 0x9d) are unmapped
+        if text.isascii():
+            return _resolve_encoding("ascii")
+        for enc in ("utf-8", "cp1252"):
             try:
                 text.decode(enc)
-            except UnicodeError:
+            except UnicodeDecodeError:
                 continue
-            return resolve_encoding(enc)
+            return _resolve_encoding(enc)
         return None
 
-    @memoizemethod_noargs
     def _body_declared_encoding(self) -> str | None:
-        return html_body_declared_encoding(self.body)
+        if self._cached_decl_enc is _NONE:
+            self._cached_decl_enc = html_body_declared_encoding(self.body)
+        return cast("str | None", self._cached_decl_enc)
 
-    @memoizemethod_noargs
     def _bom_encoding(self) -> str | None:
-        return read_bom(self.body)[0]
-
-    @property
+        if self._cached_bom_enc is _NONE:
+            body = self.body
+            # the overwhelming majority of responses carry no BOM at all, so
+            # branch on the first byte before paying for the read_bom call
+            if not body or body[0] not in (0xEF, 0xFE, 0xFF, 0x00):
+                self._cached_bom_enc = None
+            else:
+                self._cached_bom_enc = read_bom(body)[0]
+        return cast("str | None", self._cached_bom_enc)
+
+    @cached_property
     def selector(self) -> Selector:
-        from scrapy.selector import Selector
-
-        if self._cached_selector is None:
-            self._cached_selector = Selector(self)
-        return self._cached_selector
+        return _load_selector_class()(self)
 
     def jmespath(self, query: str, **kwargs: Any) -> SelectorList:
-        from scrapy.selector import SelectorList
-
         if not hasattr(self.selector, "jmespath"):
             raise AttributeError(
                 "Please install parsel >= 1.8.1 to get jmespath support"
             )
 
-        return cast(SelectorList, self.selector.jmespath(query, **kwargs))
+        return cast("SelectorList", self.selector.jmespath(query, **kwargs))
 
     def xpath(self, query: str, **kwargs: Any) -> SelectorList:
-        from scrapy.selector import SelectorList
-
-        return cast(SelectorList, self.selector.xpath(query, **kwargs))
+        sel = self.selector
+        if kwargs or sel.type not in ("html", "xml") or sel._lxml_smart_strings:
+            # XPath variables and non-lxml selector types keep the generic
+            # parsel path
+            return cast("SelectorList", sel.xpath(query, **kwargs))
+        try:
+            xpathev = _compiled_xpath(query, tuple(sorted(sel.namespaces.items())))
+            result = xpathev(sel.root)
+        except etree.XPathError as exc:
+            raise ValueError(f"XPath error: {exc} in {query}")
+        except TypeError:
+            # root does not support XPath evaluation, as in parsel
+            return cast("SelectorList", sel.selectorlist_cls([]))
+        if not isinstance(result, list):
+            result = [result]
+        cls = sel.__class__
+        return cast(
+            "SelectorList",
+            sel.selectorlist_cls(
+                cls(root=x, _expr=query, namespaces=sel.namespaces, type=sel.type)
+                for x in result
+            ),
+        )
 
     def css(self, query: str) -> SelectorList:
-        from scrapy.selector import SelectorList
-
-        return cast(SelectorList, self.selector.css(query))
+        sel = self.selector
+        if sel.type not in ("html", "xml"):
+            return cast("SelectorList", sel.css(query))
+        # parsel memoizes the css-to-xpath translation, so routing through
+        # xpath here shares the compiled-XPath cache as well
+        return self.xpath(sel._css2xpath(query))
 
     def follow(
         self,
@@ -273,10 +434,21 @@ class TextResponse(Response):
                 urls = self.xpath(xpath)
         if isinstance(urls, parsel.SelectorList):
             selectors = urls
-            urls = []
-            for sel in selectors:
-                with suppress(_InvalidSelector):
-                    urls.append(_url_from_selector(sel))
+            if all(
+                getattr(sel.root, "tag", None) in ("a", "link") for sel in selectors
+            ):
+                # the common all-anchors case: one batched XPath evaluation
+                # replaces per-selector Python dispatch, and elements without
+                # an href attribute simply contribute no result
+                urls = [
+                    strip_html5_whitespace(href)
+                    for href in selectors.xpath("./@href").getall()
+                ]
+            else:
+                urls = []
+                for sel in selectors:
+                    with suppress(_InvalidSelector):
+                        urls.append(_url_from_selector(sel))
         return super().follow_all(
             urls=cast("Iterable[str | Link]", urls),
             callback=callback,
@@ -301,16 +473,20 @@ class _InvalidSelector(ValueError):
 
 
 def _url_from_selector(sel: parsel.Selector) -> str:
-    if isinstance(sel.root, str):
+    # called once per extracted link, so keep the attribute traffic down:
+    # read sel.root and its tag exactly once each
+    root = sel.root
+    if isinstance(root, str):
         # e.g. ::attr(href) result
-        return strip_html5_whitespace(sel.root)
-    if not hasattr(sel.root, "tag"):
+        return strip_html5_whitespace(root)
+    tag = getattr(root, "tag", None)
+    if tag is None:
         raise _InvalidSelector(f"Unsupported selector: {sel}")
-    if sel.root.tag not in ("a", "link"):
+    if tag not in ("a", "link"):
         raise _InvalidSelector(
-            "Only <a> and <link> elements are supported; " f"got <{sel.root.tag}>"
+            "Only <a> and <link> elements are supported; " f"got <{tag}>"
         )
-    href = sel.root.get("href")
+    href = root.get("href")
     if href is None:
-        raise _InvalidSelector(f"<{sel.root.tag}> element has no href attribute: {sel}")
+        raise _InvalidSelector(f"<{tag}> element has no href attribute: {sel}")
     return strip_html5_whitespace(href)
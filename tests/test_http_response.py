@@ -368,6 +368,37 @@ class TextResponseTest(BaseResponseTest):
         self.assertEqual(r3.url, "http://www.example.com/other")
         self.assertEqual(r3._declared_encoding(), "latin1")
 
+    def test_urljoin_absolute(self):
+        """Absolute urls take a fast path in urljoin, which must not change
+        the urls that urllib.parse.urljoin would rewrite"""
+        body = b"<html><head><base href='http://b.example.com/sub/'></head></html>"
+        r = self.response_class("http://www.example.com/page.html", body=body)
+        # returned verbatim, base url irrelevant
+        self.assertEqual(r.urljoin("http://example.org/a"), "http://example.org/a")
+        self.assertEqual(
+            r.urljoin("https://example.org/a?q=1#f"), "https://example.org/a?q=1#f"
+        )
+        # an empty authority inherits from the base url
+        self.assertEqual(r.urljoin("http://"), "http://b.example.com/sub/")
+        self.assertEqual(r.urljoin("http:///path"), "http://b.example.com/path")
+        # tab/newline noise is stripped as urlsplit does
+        self.assertEqual(r.urljoin("http://example.org/x\ny"), "http://example.org/xy")
+        self.assertEqual(r.urljoin("http://example.org/x\ty"), "http://example.org/xy")
+        # empty query/fragment components are dropped
+        self.assertEqual(r.urljoin("http://example.org/x#"), "http://example.org/x")
+        self.assertEqual(r.urljoin("http://example.org/x?"), "http://example.org/x")
+        self.assertEqual(r.urljoin("http://example.org/x?#f"), "http://example.org/x#f")
+        # so are empty params components, which urlunparse drops
+        self.assertEqual(r.urljoin("http://example.org/x;"), "http://example.org/x")
+        self.assertEqual(r.urljoin("http://example.org/x;#f"), "http://example.org/x#f")
+        self.assertEqual(r.urljoin("http://example.org/x;?q"), "http://example.org/x?q")
+        self.assertEqual(
+            r.urljoin("http://example.org/x;p?q=1"), "http://example.org/x;p?q=1"
+        )
+        # invalid IPv6 authorities are still rejected like urljoin does
+        with self.assertRaises(ValueError):
+            r.urljoin("http://e[x/")
+
     def test_unicode_url(self):
         # instantiate with unicode url without encoding (should set default encoding)
         resp = self.response_class("http://www.example.com/")
@@ -484,6 +515,13 @@ class TextResponseTest(BaseResponseTest):
         self._assert_response_values(r3, "iso-8859-1", "\xa3")
         self._assert_response_values(r6, "gb18030", "\u2015")
         self._assert_response_values(r7, "gb18030", "\u2015")
+
+        # bytes unmapped even in cp1252 (0x81, 0x8d, 0x8f, 0x90, 0x9d) make
+        # every trial decode fail, so detection falls back to the default
+        # encoding
+        r10 = self.response_class("http://www.example.com", body=b"a\x81\x8db")
+        self.assertEqual(r10._body_inferred_encoding(), "ascii")
+        self.assertEqual(r10.text, "a\ufffd\ufffdb")
         self._assert_response_values(r9, "cp1252", "€")
 
         # TextResponse (and subclasses) must be passed a encoding when instantiating with unicode bodies